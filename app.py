@@ -3,11 +3,17 @@ Simplified Flask API for background removal
 """
 import os
 import logging
+import tempfile
+import zipfile
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 from PIL import Image
-import io
-from rembg import remove
+from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import Config
+from utils.image_processor import ImageProcessor
+from utils.validators import match_hex_color, validate_upload
+from utils import fast_blend
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +26,66 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 # Enable CORS
 CORS(app)
 
+# Load the model (and TensorRT engine, if available) once per process
+image_processor = ImageProcessor()
+
+# Compile the blend kernel now so the first request doesn't pay for it
+fast_blend.warmup()
+
+# CPU-bound post-processing (compositing, PNG encode) shared across requests
+postprocess_pool = ThreadPoolExecutor(max_workers=Config.POSTPROCESS_WORKERS)
+
+def compose_output(rgb_image: Image.Image, alpha_mask: Image.Image,
+                   background_color: str) -> Image.Image:
+    """Apply the background color, or the alpha mask for transparent output"""
+    output_image = None
+    
+    # Add background color if specified
+    if background_color and match_hex_color(background_color):
+        try:
+            output_image = image_processor.add_background_color(rgb_image, alpha_mask, background_color)
+        except Exception as e:
+            logger.warning("Failed to add background color: %s", e)
+    
+    # Transparent output: attach the mask only at the last step
+    if output_image is None:
+        rgb_image.putalpha(alpha_mask)
+        output_image = rgb_image
+    
+    return output_image
+
+def render_output(rgb_image: Image.Image, alpha_mask: Image.Image,
+                  background_color: str, output_format: str) -> str:
+    """Apply the background color (or the alpha mask) and encode the result into a temporary file"""
+    output_image = compose_output(rgb_image, alpha_mask, background_color)
+    
+    # Encode to a file so the response can be sent with sendfile(2)
+    return image_processor.image_to_file(output_image, format=output_format.upper())
+
+def render_output_bytes(result: tuple, background_color: str, output_format: str) -> bytes:
+    """Apply the background color (or the alpha mask) to one batch result and encode it"""
+    rgb_image, alpha_mask = result
+    output_image = compose_output(rgb_image, alpha_mask, background_color)
+    return image_processor.image_to_bytes(output_image, format=output_format.upper()).getvalue()
+
+def output_stem(filename: str) -> str:
+    """Upload name without extension, safe to use in a download or ZIP entry name"""
+    return secure_filename(os.path.splitext(filename)[0]) or 'image'
+
+def write_zip(entries) -> str:
+    """Write (name, data) pairs into a temporary ZIP file as they are produced and return its path"""
+    os.makedirs(Config.OUTPUT_TEMP_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=Config.OUTPUT_TEMP_DIR, suffix='.zip', delete=False) as tmp:
+        try:
+            # PNG/WebP data is already compressed, so store it as-is
+            with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_STORED) as zf:
+                for name, data in entries:
+                    zf.writestr(name, data)
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+    return tmp.name
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -47,65 +113,60 @@ def remove_background():
                 'message': 'Please select an image file'
             }), 400
         
-        # Validate file extension
-        allowed_extensions = {'png', 'jpg', 'jpeg', 'webp', 'bmp'}
-        if not ('.' in file.filename and 
-                file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
+        # Get requested output format
+        output_format = request.form.get('format', 'png').lower()
+        if output_format not in Config.OUTPUT_FORMATS:
             return jsonify({
-                'error': 'Invalid file type',
-                'message': f'Supported formats: {", ".join(allowed_extensions)}'
+                'error': 'Invalid output format',
+                'message': f'Supported output formats: {", ".join(Config.OUTPUT_FORMATS)}'
             }), 400
         
-        # Process image
-        logger.info(f"Processing image: {file.filename}")
+        is_valid, error_message = validate_upload(file)
+        if not is_valid:
+            return jsonify({
+                'error': 'Invalid image',
+                'message': error_message
+            }), 400
         
-        # Load and process image
-        input_image = Image.open(file.stream)
-        logger.info(f"Image loaded: {input_image.size}")
+        # Open the upload once (header only)
+        try:
+            input_image = Image.open(file.stream)
+        except Exception as e:
+            return jsonify({
+                'error': 'Invalid image',
+                'message': f'Invalid image file: {str(e)}'
+            }), 400
+        
+        # Process image
+        logger.info("Processing image: %s", file.filename)
+        logger.debug("Image loaded: %s", input_image.size)
         
         # Remove background
-        output_image = remove(input_image)
-        logger.info("Background removal completed")
+        rgb_image, alpha_mask = image_processor.remove_background(input_image)
+        logger.debug("Background removal completed")
         
         # Get background color if provided
         background_color = request.form.get('background_color', '')
         
-        # Add background color if specified
-        if background_color and background_color.startswith('#') and len(background_color) == 7:
-            try:
-                # Create background with color
-                if output_image.mode != 'RGBA':
-                    output_image = output_image.convert('RGBA')
-                
-                # Create colored background
-                colored_bg = Image.new('RGBA', output_image.size, background_color)
-                
-                # Composite images
-                final_image = Image.alpha_composite(colored_bg, output_image)
-                
-                # Convert to RGB
-                output_image = Image.new('RGB', final_image.size, (255, 255, 255))
-                output_image.paste(final_image, mask=final_image.split()[-1] if len(final_image.split()) == 4 else None)
-                
-                logger.info(f"Added background color: {background_color}")
-            except Exception as e:
-                logger.warning(f"Failed to add background color: {str(e)}")
-        
-        # Convert to bytes
-        img_buffer = io.BytesIO()
-        output_format = 'PNG'
-        output_image.save(img_buffer, format=output_format)
-        img_buffer.seek(0)
-        
-        logger.info("Image processing completed successfully")
+        output_path = postprocess_pool.submit(
+            render_output, rgb_image, alpha_mask, background_color, output_format
+        ).result()
+        
+        logger.debug("Image processing completed successfully")
         
         # Return processed image
-        response = send_file(
-            img_buffer,
-            mimetype='image/png',
-            as_attachment=True,
-            download_name=f'removed_bg_{file.filename}'
-        )
+        try:
+            response = send_file(
+                output_path,
+                mimetype=Config.OUTPUT_FORMATS[output_format],
+                as_attachment=True,
+                download_name=f'removed_bg_{output_stem(file.filename)}.{output_format}',
+                conditional=True
+            )
+        finally:
+            # send_file has already opened the file; the open handle keeps
+            # the data readable for the response after the path is removed
+            os.unlink(output_path)
         
         # Add cache control headers
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
@@ -116,14 +177,121 @@ def remove_background():
         
     except Exception as e:
         import traceback
-        logger.error(f"Error processing image: {str(e)}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
+        logger.error("Error processing image: %s", e)
+        logger.error("Full traceback: %s", traceback.format_exc())
         return jsonify({
             'error': 'Processing failed',
             'message': 'Failed to process image. Please try again with a different image.',
             'debug': str(e) if app.debug else None
         }), 500
 
+@app.route('/remove-background-batch', methods=['POST'])
+def remove_background_batch():
+    """Remove background from several uploaded images and return them as a ZIP archive"""
+    try:
+        files = [file for file in request.files.getlist('images') if file.filename]
+        
+        # Check if image files are provided
+        if not files:
+            return jsonify({
+                'error': 'No images provided',
+                'message': 'Please upload one or more image files as "images"'
+            }), 400
+        
+        if len(files) > Config.MAX_BATCH_IMAGES:
+            return jsonify({
+                'error': 'Too many images',
+                'message': f'A batch can contain at most {Config.MAX_BATCH_IMAGES} images'
+            }), 400
+        
+        # Get requested output format
+        output_format = request.form.get('format', 'png').lower()
+        if output_format not in Config.OUTPUT_FORMATS:
+            return jsonify({
+                'error': 'Invalid output format',
+                'message': f'Supported output formats: {", ".join(Config.OUTPUT_FORMATS)}'
+            }), 400
+        
+        # Validate every upload, then open it once (header only)
+        input_images = []
+        for file in files:
+            is_valid, error_message = validate_upload(file)
+            if is_valid:
+                try:
+                    input_images.append(Image.open(file.stream))
+                    continue
+                except Exception as e:
+                    error_message = f'Invalid image file: {str(e)}'
+            
+            for image in input_images:
+                image.close()
+            return jsonify({
+                'error': 'Invalid image',
+                'message': f'{file.filename}: {error_message}'
+            }), 400
+        
+        logger.info("Processing batch of %d images", len(input_images))
+        
+        # Remove background with batched model calls
+        results = image_processor.remove_background_batch(input_images)
+        
+        # Get background color if provided
+        background_color = request.form.get('background_color', '')
+        
+        # Name entries after the uploads, keeping them unique
+        names = []
+        for i, file in enumerate(files):
+            name = f'removed_bg_{output_stem(file.filename)}.{output_format}'
+            if name in names:
+                name = f'removed_bg_{output_stem(file.filename)}_{i}.{output_format}'
+            names.append(name)
+        
+        # Compose and encode every result in parallel. Only the pool holds
+        # the images from here on, so each is freed once it is encoded
+        pending = {
+            postprocess_pool.submit(render_output_bytes, result, background_color, output_format): name
+            for result, name in zip(results, names)
+        }
+        del results
+        input_images.clear()
+        
+        # Write each entry as soon as it is encoded, then drop its bytes
+        output_path = write_zip(
+            (pending.pop(future), future.result()) for future in as_completed(pending)
+        )
+        logger.debug("Batch processing completed successfully")
+        
+        # Return the archive
+        try:
+            response = send_file(
+                output_path,
+                mimetype='application/zip',
+                as_attachment=True,
+                download_name='removed_bg.zip',
+                conditional=True
+            )
+        finally:
+            # send_file has already opened the file; the open handle keeps
+            # the data readable for the response after the path is removed
+            os.unlink(output_path)
+        
+        # Add cache control headers
+        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+        
+        return response
+        
+    except Exception as e:
+        import traceback
+        logger.error("Error processing image batch: %s", e)
+        logger.error("Full traceback: %s", traceback.format_exc())
+        return jsonify({
+            'error': 'Processing failed',
+            'message': 'Failed to process images. Please try again with different images.',
+            'debug': str(e) if app.debug else None
+        }), 500
+
 @app.route('/api-info', methods=['GET'])
 def api_info():
     """API information endpoint"""
@@ -135,14 +303,25 @@ def api_info():
                 'description': 'Remove background from uploaded image',
                 'parameters': {
                     'image': 'Image file (required)',
-                    'background_color': 'Hex color like #FF0000 (optional)'
+                    'background_color': 'Hex color like #FF0000 (optional)',
+                    'format': f'Output format: {" or ".join(Config.OUTPUT_FORMATS)} (optional, default png)'
+                }
+            },
+            'POST /remove-background-batch': {
+                'description': 'Remove background from several images, returned as a ZIP archive',
+                'parameters': {
+                    'images': f'Image files, repeat the field up to {Config.MAX_BATCH_IMAGES} times (required)',
+                    'background_color': 'Hex color like #FF0000 (optional)',
+                    'format': f'Output format: {" or ".join(Config.OUTPUT_FORMATS)} (optional, default png)'
                 }
             }
         },
-        'supported_formats': ['png', 'jpg', 'jpeg', 'webp', 'bmp']
+        'supported_formats': sorted(Config.ALLOWED_EXTENSIONS),
+        'output_formats': list(Config.OUTPUT_FORMATS)
     })
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
     port = int(os.environ.get('PORT', 8000))
-    logger.info(f"Starting Background Removal API on port {port}")
+    logger.info("Starting Background Removal API on port %s", port)
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -2,6 +2,7 @@
 Configuration settings for the background removal API
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,18 +18,35 @@ class Config:
     # File upload settings
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_FILE_SIZE', 8 * 1024 * 1024))  # 8MB
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'temp_uploads')
+    OUTPUT_TEMP_DIR = os.environ.get('OUTPUT_TEMP_DIR') or os.path.join(tempfile.gettempdir(), 'uploads')  # Encoded responses; set to a tmpfs path such as /dev/shm/uploads to keep them in RAM
     
     # Image processing settings
     MAX_IMAGE_WIDTH = int(os.environ.get('MAX_IMAGE_WIDTH', 4000))
     MAX_IMAGE_HEIGHT = int(os.environ.get('MAX_IMAGE_HEIGHT', 4000))
     MIN_IMAGE_SIZE = int(os.environ.get('MIN_IMAGE_SIZE', 100))
     
+    # Model settings
+    INFERENCE_MAX_SIZE = int(os.environ.get('INFERENCE_MAX_SIZE', 1024))  # Long edge fed to the model
+    U2NET_INT8_MODEL = os.environ.get('U2NET_INT8_MODEL', '')  # Output of utils/quantization.py
+    WARMUP = os.environ.get('WARMUP', '1') == '1'  # Run a dummy inference at startup
+    
+    # Output settings
+    PNG_COMPRESS_LEVEL = int(os.environ.get('PNG_COMPRESS_LEVEL', 1))  # 0-9, Pillow default is 6
+    OUTPUT_FORMATS = {'png': 'image/png', 'webp': 'image/webp'}  # Format -> mimetype
+    
+    # Concurrency settings
+    INFERENCE_CONCURRENCY = int(os.environ.get('INFERENCE_CONCURRENCY', 2))  # Parallel model calls
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 8))  # Images merged into one model call
+    MAX_BATCH_IMAGES = int(os.environ.get('MAX_BATCH_IMAGES', 16))  # Images per /remove-background-batch request
+    BATCH_WAIT_MS = float(os.environ.get('BATCH_WAIT_MS', 5))  # How long to wait for a batch to fill
+    POSTPROCESS_WORKERS = int(os.environ.get('POSTPROCESS_WORKERS', os.cpu_count() or 1))
+    
     # API settings
     RATE_LIMIT = os.environ.get('RATE_LIMIT', '1500 per hour')
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
     
     # Allowed file extensions
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'bmp', 'tiff'}
+    ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'webp', 'bmp', 'tiff'})
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -0,0 +1,13 @@
+"""
+Gunicorn configuration for the background removal API
+
+One worker process keeps a single copy of the model in memory; requests
+are served concurrently by its threads.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
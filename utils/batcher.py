@@ -0,0 +1,79 @@
+"""
+Micro-batching of model inference across concurrent requests
+"""
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """Merge inputs that arrive within a few milliseconds into one model call"""
+
+    def __init__(self, run_batch: Callable[[np.ndarray], np.ndarray],
+                 max_batch: int = 8, max_wait_ms: float = 5, workers: int = 1):
+        """
+        Args:
+            run_batch (Callable): Runs the model on an (N, C, H, W) array and
+                returns an array whose first dimension is N
+            max_batch (int): Maximum number of inputs per model call
+            max_wait_ms (float): How long to wait for more inputs after the first
+            workers (int): Number of model calls allowed in flight at once
+        """
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+
+        for i in range(max(1, workers)):
+            threading.Thread(target=self._worker, name=f'batcher-{i}', daemon=True).start()
+
+    def submit(self, tensor: np.ndarray) -> Future:
+        """
+        Queue a single (C, H, W) input
+
+        Args:
+            tensor (np.ndarray): Preprocessed model input without batch dimension
+
+        Returns:
+            Future: Resolves to the model output for this input
+        """
+        future = Future()
+        self._queue.put((tensor, future))
+        return future
+
+    def _collect(self) -> list:
+        """Block for one item, then drain more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._collect()
+            futures = [future for _, future in batch]
+
+            try:
+                outputs = self.run_batch(np.stack([tensor for tensor, _ in batch]))
+            except Exception as e:
+                logger.error("Batched inference failed: %s", e)
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for i, future in enumerate(futures):
+                future.set_result(outputs[i])
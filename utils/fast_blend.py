@@ -0,0 +1,60 @@
+"""
+Fast uint8 alpha blending kernels for background color compositing
+"""
+import logging
+import numpy as np
+
+# Numba is optional; without it the same integer blend runs in NumPy
+try:
+    import numba
+    # The kernel is called from several pool threads at once; the default
+    # workqueue layer aborts on concurrent parallel calls, TBB/OpenMP do not
+    numba.config.THREADING_LAYER = 'threadsafe'
+except ImportError:
+    numba = None
+
+logger = logging.getLogger(__name__)
+
+def _blend_on_color_numpy(rgb: np.ndarray, alpha: np.ndarray, bg_r: int, bg_g: int, bg_b: int,
+                          out: np.ndarray) -> np.ndarray:
+    """NumPy version of blend_on_color, used when Numba is not installed"""
+    a = alpha[..., np.newaxis].astype(np.uint16)
+    bg = np.array([bg_r, bg_g, bg_b], dtype=np.uint16)
+    out[...] = (rgb * a + bg * (255 - a) + 127) // 255
+    return out
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def blend_on_color(rgb, alpha, bg_r, bg_g, bg_b, out):
+        """
+        Blend an RGB foreground with a separate alpha mask over a solid color,
+        writing RGB into ``out``
+
+        Args:
+            rgb (np.ndarray): HxWx3 uint8 foreground
+            alpha (np.ndarray): HxW uint8 alpha mask
+            bg_r, bg_g, bg_b (int): Background color channels
+            out (np.ndarray): HxWx3 uint8 output buffer
+
+        Returns:
+            np.ndarray: ``out``
+        """
+        height, width, _ = rgb.shape
+        for y in numba.prange(height):
+            for x in range(width):
+                a = np.int32(alpha[y, x])
+                inv = 255 - a
+                out[y, x, 0] = (rgb[y, x, 0] * a + bg_r * inv + 127) // 255
+                out[y, x, 1] = (rgb[y, x, 1] * a + bg_g * inv + 127) // 255
+                out[y, x, 2] = (rgb[y, x, 2] * a + bg_b * inv + 127) // 255
+        return out
+else:
+    blend_on_color = _blend_on_color_numpy
+
+def warmup() -> None:
+    """Compile the blend kernel ahead of the first request"""
+    rgb = np.zeros((16, 16, 3), dtype=np.uint8)
+    alpha = np.zeros((16, 16), dtype=np.uint8)
+    out = np.empty((16, 16, 3), dtype=np.uint8)
+    blend_on_color(rgb, alpha, 255, 255, 255, out)
+    logger.info("Blend kernel ready (%s)", 'numba' if numba is not None else 'numpy')
@@ -2,98 +2,479 @@
 Image processing utilities for background removal
 """
 import io
+import os
 import logging
-from typing import Optional, Tuple
-from PIL import Image, ImageDraw
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+from PIL import Image, ImageChops, ImageDraw, ImageOps
 import numpy as np
 from rembg import remove, new_session
+from rembg.sessions import sessions_class
+from config import Config
+from utils.batcher import MicroBatcher
+from utils.fast_blend import blend_on_color
+from utils.validators import parse_hex_color
+
+# libspng encoder is optional; Pillow's PNG encoder is used without it.
+# Only the pyspng-seunglab build ships encode(), plain pyspng decodes only.
+try:
+    import pyspng
+    if not hasattr(pyspng, 'encode'):
+        pyspng = None
+except ImportError:
+    pyspng = None
+
+# TensorRT is optional; without it we fall back to rembg's ONNX Runtime session
+try:
+    import tensorrt as trt
+    import pycuda.driver as cuda
+except ImportError:
+    trt = None
+    cuda = None
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# U2Net input resolution and normalization (same values rembg uses)
+MODEL_INPUT_SIZE = 320
+MODEL_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(1, 3, 1, 1)
+MODEL_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(1, 3, 1, 1)
+
+def log_pillow_build() -> None:
+    """Log whether Pillow-SIMD is installed and which SIMD extensions the CPU supports"""
+    import PIL
+    
+    if '.post' not in PIL.__version__:
+        logger.info("Using stock Pillow %s; install pillow-simd for faster resize/composite", PIL.__version__)
+        return
+    
+    flags = set()
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    flags = set(line.split(':', 1)[1].split())
+                    break
+    except OSError:
+        pass
+    isa = 'AVX2' if 'avx2' in flags else 'SSE4' if 'sse4_1' in flags else 'neither SSE4 nor AVX2'
+    logger.info("Using Pillow-SIMD %s; CPU supports %s", PIL.__version__, isa)
+
+def get_model_path(model_name: str = 'u2net') -> str:
+    """
+    Get the path of the ONNX model downloaded by rembg
+    
+    Args:
+        model_name (str): rembg model name
+        
+    Returns:
+        str: Path to the ONNX file (downloaded first if missing)
+    """
+    # Ask rembg itself: its model directory layout differs between releases
+    session_class = next(cls for cls in sessions_class if cls.name() == model_name)
+    return session_class.download_models()
+
+# Modes whose pixels map straight onto RGB arrays without PIL's convert()
+ARRAY_COMPATIBLE_MODES = ('RGB', 'RGBA', 'L')
+
+def to_rgb_array(image: Image.Image) -> np.ndarray:
+    """
+    Get an HxWx3 uint8 RGB array for an image
+    
+    Grayscale is broadcast and alpha dropped with NumPy; other modes go
+    through PIL's convert().
+    
+    Args:
+        image (PIL.Image.Image): Input image
+        
+    Returns:
+        np.ndarray: RGB pixel array
+    """
+    if image.mode not in ARRAY_COMPATIBLE_MODES:
+        image = image.convert('RGB')
+    
+    arr = np.asarray(image)
+    if arr.ndim == 2:
+        arr = np.stack([arr] * 3, -1)
+    elif arr.shape[-1] == 4:
+        arr = arr[..., :3]
+    return arr
+
+def preprocess_for_model(image: Image.Image) -> np.ndarray:
+    """
+    Convert an image to a normalized 1x3x320x320 float32 tensor for U2Net
+    
+    Args:
+        image (PIL.Image.Image): Input image
+        
+    Returns:
+        np.ndarray: Model input tensor in NCHW layout
+    """
+    if image.mode not in ARRAY_COMPATIBLE_MODES:
+        image = image.convert('RGB')
+    
+    # Resize first so only 320x320 pixels are reshaped into RGB
+    resized = image.resize((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), Image.Resampling.LANCZOS)
+    arr = to_rgb_array(resized).astype(np.float32).transpose(2, 0, 1)[np.newaxis]
+    arr = arr / max(float(arr.max()), 1e-6)
+    return np.ascontiguousarray((arr - MODEL_MEAN) / MODEL_STD, dtype=np.float32)
+
+def postprocess_mask(prediction: np.ndarray, size: Tuple[int, int]) -> Image.Image:
+    """
+    Turn a raw U2Net prediction into an alpha mask of the given size
+    
+    Args:
+        prediction (np.ndarray): Model output of shape (1, 320, 320) or (320, 320)
+        size (Tuple[int, int]): Target (width, height)
+        
+    Returns:
+        PIL.Image.Image: Mask in 'L' mode
+    """
+    pred = np.squeeze(prediction).astype(np.float32)
+    lo, hi = float(pred.min()), float(pred.max())
+    pred = (pred - lo) / max(hi - lo, 1e-6)
+    mask = Image.fromarray((pred * 255).astype(np.uint8), mode='L')
+    return mask.resize(size, Image.Resampling.LANCZOS)
+
 class ImageProcessor:
     """Handle image processing operations"""
     
     def __init__(self):
         """Initialize the image processor with rembg session"""
+        log_pillow_build()
+        
+        use_int8 = bool(Config.U2NET_INT8_MODEL) and os.path.exists(Config.U2NET_INT8_MODEL)
+        if Config.U2NET_INT8_MODEL and not use_int8:
+            logger.warning("U2NET_INT8_MODEL %s not found; using the FP32 u2net model", Config.U2NET_INT8_MODEL)
         try:
             # Initialize rembg session for better performance
-            self.session = new_session('u2net')  # You can use different models
+            if use_int8:
+                providers = [
+                    ('CUDAExecutionProvider', {'cudnn_conv_algo_search': 'EXHAUSTIVE'}),
+                    'CPUExecutionProvider',
+                ]
+                self.session = new_session('u2net_custom', providers=providers,
+                                           model_path=Config.U2NET_INT8_MODEL)
+                logger.info("Using INT8 model: %s", Config.U2NET_INT8_MODEL)
+            else:
+                self.session = new_session('u2net')  # You can use different models
             logger.info("ImageProcessor initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize ImageProcessor: {str(e)}")
+            logger.error("Failed to initialize ImageProcessor: %s", e)
             self.session = None
+        
+        # Build the TensorRT engine once at startup, keep rembg as fallback.
+        # The engine is built from the FP32 model, so it is skipped when an
+        # INT8 model is configured; otherwise the quantized session would go unused
+        self.engine = None
+        self.context = None
+        if trt is not None and self.session and not use_int8:
+            try:
+                self._init_trt_engine(get_model_path('u2net'))
+                logger.info("TensorRT FP16 engine ready")
+            except Exception as e:
+                logger.warning("TensorRT unavailable, using rembg session: %s", e)
+                self.engine = None
+                self.context = None
+        
+        # Requests arriving together share one forward pass; the number of
+        # batcher workers caps concurrent model calls to avoid VRAM thrash
+        self._batcher = None
+        if self.context is not None:
+            self._batcher = MicroBatcher(self._trt_infer, self._trt_max_batch,
+                                         Config.BATCH_WAIT_MS, workers=1)
+        elif self.session:
+            batch_dim = self.session.inner_session.get_inputs()[0].shape[0]
+            max_batch = 1 if isinstance(batch_dim, int) else Config.MAX_BATCH_SIZE
+            self._batcher = MicroBatcher(self._run_session_batch, max_batch,
+                                         Config.BATCH_WAIT_MS, workers=Config.INFERENCE_CONCURRENCY)
+        
+        if Config.WARMUP:
+            self._warmup()
+    
+    def _warmup(self) -> None:
+        """Run dummy inputs through the model so the first request doesn't pay for lazy initialization"""
+        try:
+            # Exercise the Pillow resampling code paths once
+            Image.new('RGB', (8, 8)).resize((16, 16), Image.Resampling.LANCZOS)
+            
+            if self._batcher is not None:
+                # TensorRT needs a few runs for autotuning and clocks to settle
+                iterations = 3 if self.context is not None else 1
+                dummy = np.zeros((1, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), dtype=np.float32)
+                for _ in range(iterations):
+                    self._batcher.run_batch(dummy)
+            
+            logger.info("Model warmup completed")
+        except Exception as e:
+            logger.warning("Model warmup failed: %s", e)
+    
+    def _init_trt_engine(self, onnx_path: str) -> None:
+        """
+        Build (or load a cached) FP16 TensorRT engine for the U2Net ONNX model
+        
+        Args:
+            onnx_path (str): Path to u2net.onnx
+        """
+        cuda.init()
+        self._cuda_ctx = cuda.Device(0).retain_primary_context()
+        self._cuda_ctx.push()
+        try:
+            trt_logger = trt.Logger(trt.Logger.WARNING)
+            plan_path = os.path.splitext(onnx_path)[0] + f'_fp16_b{Config.MAX_BATCH_SIZE}.plan'
+            
+            if os.path.exists(plan_path):
+                with open(plan_path, 'rb') as f:
+                    plan = f.read()
+            else:
+                builder = trt.Builder(trt_logger)
+                network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+                parser = trt.OnnxParser(network, trt_logger)
+                with open(onnx_path, 'rb') as f:
+                    if not parser.parse(f.read()):
+                        raise RuntimeError(f"Failed to parse {onnx_path}: {parser.get_error(0)}")
+                
+                config = builder.create_builder_config()
+                config.set_flag(trt.BuilderFlag.FP16)
+                
+                # Dynamic batch 1..MAX_BATCH_SIZE when the model allows it
+                model_input = network.get_input(0)
+                max_batch = Config.MAX_BATCH_SIZE if model_input.shape[0] == -1 else 1
+                min_shape = (1, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+                max_shape = (max_batch, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+                profile = builder.create_optimization_profile()
+                profile.set_shape(model_input.name, min_shape, min_shape, max_shape)
+                config.add_optimization_profile(profile)
+                
+                plan = builder.build_serialized_network(network, config)
+                if plan is None:
+                    raise RuntimeError("TensorRT engine build failed")
+                with open(plan_path, 'wb') as f:
+                    f.write(plan)
+                logger.info("Saved TensorRT engine to %s", plan_path)
+            
+            self.engine = trt.Runtime(trt_logger).deserialize_cuda_engine(plan)
+            self.context = self.engine.create_execution_context()
+            self._stream = cuda.Stream()
+            
+            # Size buffers for the largest batch the engine accepts
+            self._trt_input_name = self.engine.get_tensor_name(0)
+            max_shape = self.engine.get_tensor_profile_shape(self._trt_input_name, 0)[2]
+            self._trt_max_batch = max_shape[0]
+            self.context.set_input_shape(self._trt_input_name, max_shape)
+            
+            # Allocate pinned host and device buffers for every I/O tensor once
+            self._trt_buffers = []
+            for i in range(self.engine.num_io_tensors):
+                name = self.engine.get_tensor_name(i)
+                shape = tuple(self.context.get_tensor_shape(name))
+                dtype = trt.nptype(self.engine.get_tensor_dtype(name))
+                host = cuda.pagelocked_empty(shape, dtype)
+                device = cuda.mem_alloc(host.nbytes)
+                is_input = self.engine.get_tensor_mode(name) == trt.TensorIOMode.INPUT
+                self._trt_buffers.append((host, device, is_input))
+            self._trt_lock = threading.Lock()
+        finally:
+            self._cuda_ctx.pop()
+    
+    def _trt_infer(self, np_chw: np.ndarray) -> np.ndarray:
+        """
+        Run the TensorRT engine on a preprocessed tensor
+        
+        Args:
+            np_chw (np.ndarray): Input tensor of shape (N, 3, 320, 320)
+            
+        Returns:
+            np.ndarray: First model output (the fused saliency map), shape (N, 1, 320, 320)
+        """
+        n = np_chw.shape[0]
+        with self._trt_lock:
+            self._cuda_ctx.push()
+            try:
+                inputs = [buf for buf in self._trt_buffers if buf[2]]
+                outputs = [buf for buf in self._trt_buffers if not buf[2]]
+                
+                self.context.set_input_shape(self._trt_input_name, np_chw.shape)
+                host_in, device_in, _ = inputs[0]
+                np.copyto(host_in[:n], np_chw.astype(host_in.dtype, copy=False))
+                cuda.memcpy_htod_async(device_in, host_in[:n], self._stream)
+                self._stream.synchronize()
+                
+                self.context.execute_v2([int(device) for _, device, _ in self._trt_buffers])
+                
+                host_out, device_out, _ = outputs[0]
+                cuda.memcpy_dtoh_async(host_out[:n], device_out, self._stream)
+                self._stream.synchronize()
+                return host_out[:n].copy()
+            finally:
+                self._cuda_ctx.pop()
+    
+    def _run_session_batch(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run the ONNX Runtime session directly on a batch, bypassing rembg's
+        single-image path
+        
+        Args:
+            batch (np.ndarray): Input tensor of shape (N, 3, 320, 320)
+            
+        Returns:
+            np.ndarray: First model output, shape (N, 1, 320, 320)
+        """
+        inner_session = self.session.inner_session
+        input_name = inner_session.get_inputs()[0].name
+        return inner_session.run(None, {input_name: batch})[0]
     
-    def remove_background(self, input_image: Image.Image) -> Image.Image:
+    def remove_background(self, input_image: Image.Image) -> Tuple[Image.Image, Image.Image]:
         """
         Remove background from image using rembg
         
+        The foreground and alpha are returned separately so later steps
+        touch one byte per pixel for the mask; combine them with
+        ``rgb_image.putalpha(alpha_mask)`` for a transparent image.
+        
         Args:
             input_image (PIL.Image.Image): Input image
             
         Returns:
-            PIL.Image.Image: Image with background removed (transparent)
+            Tuple[PIL.Image.Image, PIL.Image.Image]: (RGB image, 'L' mode alpha mask)
             
         Raises:
             Exception: If background removal fails
         """
         try:
-            logger.info(f"Processing image: {input_image.size}, mode: {input_image.mode}")
-            
-            # Convert image to RGB if necessary
-            if input_image.mode not in ['RGB', 'RGBA']:
-                input_image = input_image.convert('RGB')
-                logger.info("Converted image to RGB mode")
+            input_image, working_image = self._prepare_input(input_image)
             
             # Remove background
-            if self.session:
-                output_image = remove(input_image, session=self.session)
+            if self._batcher is not None:
+                tensor = preprocess_for_model(working_image)[0]
+                prediction = self._batcher.submit(tensor).result()
+                mask = postprocess_mask(prediction, input_image.size)
             else:
-                output_image = remove(input_image)
+                mask = remove(working_image, only_mask=True)
             
-            logger.info("Background removal completed successfully")
-            return output_image
+            logger.debug("Background removal completed successfully")
+            return self._finish_output(input_image, mask)
             
         except Exception as e:
-            logger.error(f"Background removal failed: {str(e)}")
+            logger.error("Background removal failed: %s", e)
             raise Exception(f"Failed to remove background: {str(e)}")
     
-    def add_background_color(self, transparent_image: Image.Image, 
-                           bg_color: str = '#FFFFFF') -> Image.Image:
+    def remove_background_batch(self, input_images: List[Image.Image]) -> List[Tuple[Image.Image, Image.Image]]:
         """
-        Add solid color background to transparent image
+        Remove background from several images with one model call per batch
         
         Args:
-            transparent_image (PIL.Image.Image): Image with transparent background
-            bg_color (str): Background color in hex format
+            input_images (List[PIL.Image.Image]): Input images
             
         Returns:
-            PIL.Image.Image: Image with colored background
+            List[Tuple[PIL.Image.Image, PIL.Image.Image]]: (RGB image, 'L' mode alpha mask) per input
+            
+        Raises:
+            Exception: If background removal fails
         """
         try:
-            # Create background image
-            if transparent_image.mode != 'RGBA':
-                transparent_image = transparent_image.convert('RGBA')
+            prepared = [self._prepare_input(image) for image in input_images]
             
-            # Create background
-            background = Image.new('RGBA', transparent_image.size, bg_color + '00')
+            if self._batcher is not None:
+                # Queue every image at once; the batcher merges them (and any
+                # concurrent single-image requests) into batches of up to
+                # max_batch while keeping the INFERENCE_CONCURRENCY cap.
+                # Preprocess first so the submits land within one batch window
+                tensors = [preprocess_for_model(working)[0] for _, working in prepared]
+                futures = [self._batcher.submit(tensor) for tensor in tensors]
+                masks = [postprocess_mask(future.result(), image.size)
+                         for future, (image, _) in zip(futures, prepared)]
+            else:
+                masks = [remove(working, only_mask=True) for _, working in prepared]
             
-            # Create colored background
-            colored_bg = Image.new('RGBA', transparent_image.size, bg_color)
+            logger.debug("Batch background removal completed for %d images", len(prepared))
+            return [self._finish_output(image, mask) for (image, _), mask in zip(prepared, masks)]
             
-            # Composite images
-            result = Image.alpha_composite(colored_bg, transparent_image)
+        except Exception as e:
+            logger.error("Batch background removal failed: %s", e)
+            raise Exception(f"Failed to remove background: {str(e)}")
+    
+    def _prepare_input(self, input_image: Image.Image) -> Tuple[Image.Image, Image.Image]:
+        """
+        Normalize the image mode and make the downscaled copy used for inference
+        
+        Args:
+            input_image (PIL.Image.Image): Input image
+            
+        Returns:
+            Tuple[PIL.Image.Image, PIL.Image.Image]: (full-resolution image, inference image)
+        """
+        logger.debug("Processing image: %s, mode: %s", input_image.size, input_image.mode)
+        
+        # Apply the EXIF orientation (phone photos) before anything else, as rembg's remove() does.
+        # exif_transpose always returns a copy, so only call it when there is a rotation to apply
+        if input_image.getexif().get(0x0112, 1) != 1:
+            input_image = ImageOps.exif_transpose(input_image)
+        
+        # Convert image to RGB if necessary (RGB, RGBA and L are handled as arrays);
+        # images with their own transparency become RGBA so it isn't lost
+        if input_image.mode not in ARRAY_COMPATIBLE_MODES:
+            has_alpha = 'A' in input_image.getbands() or 'transparency' in input_image.info
+            input_image = input_image.convert('RGBA' if has_alpha else 'RGB')
+            logger.debug("Converted image to %s mode", input_image.mode)
+        
+        # Run the model on a downscaled copy; only the alpha mask is
+        # scaled back up and applied to the full-resolution original
+        working_image = self.optimize_image_size(input_image, Config.INFERENCE_MAX_SIZE)
+        return input_image, working_image
+    
+    def _finish_output(self, input_image: Image.Image,
+                       mask: Image.Image) -> Tuple[Image.Image, Image.Image]:
+        """
+        Match the mask to the full-resolution image and return both as RGB + 'L'
+        
+        Args:
+            input_image (PIL.Image.Image): Full-resolution image
+            mask (PIL.Image.Image): Predicted alpha mask
+            
+        Returns:
+            Tuple[PIL.Image.Image, PIL.Image.Image]: (RGB image, 'L' mode alpha mask)
+        """
+        if mask.size != input_image.size:
+            mask = mask.resize(input_image.size, Image.Resampling.BILINEAR)
+        
+        # Keep the upload's own transparency: combine it with the model mask
+        if 'A' in input_image.getbands():
+            mask = ImageChops.multiply(mask, input_image.getchannel('A'))
+        
+        if input_image.mode != 'RGB':
+            input_image = Image.fromarray(to_rgb_array(input_image), 'RGB')
+        
+        return input_image, mask
+    
+    def add_background_color(self, rgb_image: Image.Image, alpha_mask: Image.Image,
+                           bg_color: str = '#FFFFFF') -> Image.Image:
+        """
+        Add solid color background behind a foreground and its alpha mask
+        
+        Args:
+            rgb_image (PIL.Image.Image): Foreground image
+            alpha_mask (PIL.Image.Image): Alpha mask in 'L' mode
+            bg_color (str): Background color in hex format
+            
+        Returns:
+            PIL.Image.Image: Image with colored background
+        """
+        try:
+            # Blend foreground over the solid color in a single uint8 pass
+            rgb = to_rgb_array(rgb_image)
+            alpha = np.asarray(alpha_mask.convert('L') if alpha_mask.mode != 'L' else alpha_mask)
+            bg_r, bg_g, bg_b = parse_hex_color(bg_color)
+            out = np.empty(rgb.shape, dtype=np.uint8)
+            blend_on_color(rgb, alpha, bg_r, bg_g, bg_b, out)
             
-            # Convert to RGB for final output
-            final_image = Image.new('RGB', result.size, (255, 255, 255))
-            final_image.paste(result, mask=result.split()[-1])
+            final_image = Image.fromarray(out, 'RGB')
             
-            logger.info(f"Added background color: {bg_color}")
+            logger.debug("Added background color: %s", bg_color)
             return final_image
             
         except Exception as e:
-            logger.error(f"Failed to add background color: {str(e)}")
+            logger.error("Failed to add background color: %s", e)
             raise Exception(f"Failed to add background color: {str(e)}")
     
     def optimize_image_size(self, image: Image.Image, max_size: int = 2048) -> Image.Image:
@@ -121,14 +502,14 @@ class ImageProcessor:
             new_width = int((width * max_size) / height)
         
         resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        logger.info(f"Resized image from {width}x{height} to {new_width}x{new_height}")
+        logger.debug("Resized image from %dx%d to %dx%d", width, height, new_width, new_height)
         
         return resized_image
     
-    def image_to_bytes(self, image: Image.Image, format: str = 'PNG', 
-                      quality: int = 95) -> io.BytesIO:
+    def _prepare_save(self, image: Image.Image, format: str,
+                      quality: int) -> Tuple[Image.Image, dict]:
         """
-        Convert PIL Image to bytes
+        Get the image and Pillow save() arguments for the requested format
         
         Args:
             image (PIL.Image.Image): Input image
@@ -136,10 +517,8 @@ class ImageProcessor:
             quality (int): Image quality for JPEG
             
         Returns:
-            io.BytesIO: Image as bytes buffer
+            Tuple[PIL.Image.Image, dict]: (image to save, save keyword arguments)
         """
-        img_buffer = io.BytesIO()
-        
         if format.upper() == 'JPEG' and image.mode in ['RGBA', 'P']:
             # Convert to RGB for JPEG
             rgb_image = Image.new('RGB', image.size, (255, 255, 255))
@@ -153,8 +532,78 @@ class ImageProcessor:
         if format.upper() == 'JPEG':
             save_kwargs['quality'] = quality
             save_kwargs['optimize'] = True
+        elif format.upper() == 'PNG':
+            # zlib level dominates encode time; low levels trade a little size for speed
+            save_kwargs['compress_level'] = Config.PNG_COMPRESS_LEVEL
+            save_kwargs['optimize'] = False
+        elif format.upper() == 'WEBP':
+            # Lossless keeps the alpha edge intact; method=0 is the fastest encoder setting
+            save_kwargs['lossless'] = True
+            save_kwargs['quality'] = 90
+            save_kwargs['method'] = 0
         
-        image.save(img_buffer, **save_kwargs)
+        return image, save_kwargs
+    
+    def _write_image(self, image: Image.Image, fp, format: str, quality: int) -> None:
+        """
+        Encode an image into a file object, using libspng for PNG when installed
+        
+        Args:
+            image (PIL.Image.Image): Input image
+            fp: Writable binary file object
+            format (str): Output format
+            quality (int): Image quality for JPEG
+        """
+        if format.upper() == 'PNG' and pyspng is not None and image.mode in ARRAY_COMPATIBLE_MODES:
+            fp.write(pyspng.encode(np.asarray(image), compress_level=Config.PNG_COMPRESS_LEVEL))
+            return
+        
+        image, save_kwargs = self._prepare_save(image, format, quality)
+        image.save(fp, **save_kwargs)
+    
+    def image_to_bytes(self, image: Image.Image, format: str = 'PNG', 
+                      quality: int = 95) -> io.BytesIO:
+        """
+        Convert PIL Image to bytes
+        
+        Args:
+            image (PIL.Image.Image): Input image
+            format (str): Output format
+            quality (int): Image quality for JPEG
+            
+        Returns:
+            io.BytesIO: Image as bytes buffer
+        """
+        img_buffer = io.BytesIO()
+        
+        self._write_image(image, img_buffer, format, quality)
         img_buffer.seek(0)
         
         return img_buffer
+    
+    def image_to_file(self, image: Image.Image, format: str = 'PNG',
+                      quality: int = 95) -> str:
+        """
+        Encode PIL Image into a temporary file
+        
+        The caller owns the file and must delete it. Serving a real file lets
+        the WSGI server use sendfile(2) instead of copying a BytesIO through Python.
+        
+        Args:
+            image (PIL.Image.Image): Input image
+            format (str): Output format
+            quality (int): Image quality for JPEG
+            
+        Returns:
+            str: Path of the encoded file
+        """
+        os.makedirs(Config.OUTPUT_TEMP_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=Config.OUTPUT_TEMP_DIR, suffix=f'.{format.lower()}',
+                                         delete=False) as tmp:
+            try:
+                self._write_image(image, tmp, format, quality)
+            except Exception:
+                os.unlink(tmp.name)
+                raise
+        
+        return tmp.name
@@ -0,0 +1,117 @@
+"""
+INT8 post-training quantization of the U2Net segmentation model
+
+Usage:
+    python -m utils.quantization --calibration-dir samples/ --output u2net_int8.onnx
+"""
+import os
+import argparse
+import logging
+from typing import Iterator, List, Optional
+from PIL import Image
+import onnx
+from onnxruntime.quantization import (
+    CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+)
+from utils.image_processor import get_model_path, preprocess_for_model
+
+logger = logging.getLogger(__name__)
+
+# Name fragments of the layers that produce the final alpha mask (the RSU-1
+# decoder stage and the side-output fusion). These stay in floating point.
+SENSITIVE_NODE_KEYS = ('stage1d', 'side1', 'outconv')
+
+class U2NetCalibrationReader(CalibrationDataReader):
+    """Feed preprocessed sample images to the ONNX Runtime calibrator"""
+
+    def __init__(self, image_dir: str, input_name: str, limit: int = 200):
+        """
+        Args:
+            image_dir (str): Directory with representative images
+            input_name (str): Name of the model input tensor
+            limit (int): Maximum number of calibration images
+        """
+        self.input_name = input_name
+        self.paths = sorted(
+            os.path.join(image_dir, name) for name in os.listdir(image_dir)
+            if name.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.bmp'))
+        )[:limit]
+        self._iterator: Optional[Iterator[dict]] = None
+
+    def _samples(self) -> Iterator[dict]:
+        for path in self.paths:
+            with Image.open(path) as img:
+                yield {self.input_name: preprocess_for_model(img)}
+
+    def get_next(self) -> Optional[dict]:
+        if self._iterator is None:
+            self._iterator = self._samples()
+        return next(self._iterator, None)
+
+    def rewind(self) -> None:
+        self._iterator = None
+
+def find_sensitive_nodes(model: onnx.ModelProto, tail: int = 8) -> List[str]:
+    """
+    Find the nodes that should be excluded from INT8 quantization
+
+    Args:
+        model (onnx.ModelProto): Loaded U2Net model
+        tail (int): Number of trailing Conv nodes to keep in float when the
+            graph has no descriptive node names
+
+    Returns:
+        List[str]: Node names to pass as nodes_to_exclude
+    """
+    nodes = [node.name for node in model.graph.node
+             if any(key in node.name for key in SENSITIVE_NODE_KEYS)]
+    if nodes:
+        return nodes
+
+    convs = [node.name for node in model.graph.node if node.op_type == 'Conv']
+    return convs[-tail:]
+
+def quantize_u2net(calibration_dir: str, output_path: str,
+                   model_path: Optional[str] = None, limit: int = 200) -> str:
+    """
+    Quantize u2net.onnx to INT8 with static (calibrated) quantization
+
+    Args:
+        calibration_dir (str): Directory with representative images
+        output_path (str): Where to write the quantized model
+        model_path (str): Source ONNX model, defaults to rembg's u2net.onnx
+        limit (int): Maximum number of calibration images
+
+    Returns:
+        str: Path of the quantized model
+    """
+    model_path = model_path or get_model_path('u2net')
+    model = onnx.load(model_path)
+    input_name = model.graph.input[0].name
+    excluded = find_sensitive_nodes(model)
+    logger.info("Keeping %d mask-decoder nodes in float precision", len(excluded))
+
+    reader = U2NetCalibrationReader(calibration_dir, input_name, limit)
+    quantize_static(
+        model_path,
+        output_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=excluded,
+    )
+    logger.info("Saved INT8 model to %s", output_path)
+    return output_path
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Quantize the U2Net model to INT8')
+    parser.add_argument('--calibration-dir', required=True, help='Directory with sample images')
+    parser.add_argument('--output', default='u2net_int8.onnx', help='Output model path')
+    parser.add_argument('--model', default=None, help='Source ONNX model (defaults to rembg u2net)')
+    parser.add_argument('--limit', type=int, default=200, help='Number of calibration images')
+    args = parser.parse_args()
+    quantize_u2net(args.calibration_dir, args.output, args.model, args.limit)
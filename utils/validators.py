@@ -2,11 +2,17 @@
 Input validation utilities for the background removal API
 """
 import os
+import re
+from functools import lru_cache
 from typing import Tuple, Optional
 from PIL import Image
 from werkzeug.datastructures import FileStorage
 from config import Config
 
+# Compiled once at import instead of per request
+ALLOWED_EXTENSIONS = Config.ALLOWED_EXTENSIONS
+match_hex_color = re.compile(r'#[0-9A-Fa-f]{6}').fullmatch
+
 def allowed_file(filename: str) -> bool:
     """
     Check if the uploaded file has an allowed extension
@@ -17,16 +23,15 @@ def allowed_file(filename: str) -> bool:
     Returns:
         bool: True if file extension is allowed, False otherwise
     """
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1][1:].lower() in ALLOWED_EXTENSIONS
 
-def validate_image_file(file: FileStorage) -> Tuple[bool, Optional[str]]:
+def validate_upload(file: FileStorage) -> Tuple[bool, Optional[str]]:
     """
-    Validate uploaded image file
+    Validate the uploaded file's name and size without decoding it
     
     Args:
         file (FileStorage): Uploaded file object
-        
+    
     Returns:
         Tuple[bool, Optional[str]]: (is_valid, error_message)
     """
@@ -36,43 +41,48 @@ def validate_image_file(file: FileStorage) -> Tuple[bool, Optional[str]]:
     
     # Check file extension
     if not allowed_file(file.filename):
-        return False, f"File type not allowed. Supported formats: {', '.join(Config.ALLOWED_EXTENSIONS)}"
+        return False, f"File type not allowed. Supported formats: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
     
-    # Check file size (Flask handles MAX_CONTENT_LENGTH, but we can add custom validation)
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)  # Reset file pointer
+    # Flask enforces MAX_CONTENT_LENGTH on the request; check the part size when the client sent it
+    if file.content_length and file.content_length > Config.MAX_CONTENT_LENGTH:
+        return False, f"File too large. Maximum size: {Config.MAX_CONTENT_LENGTH // (1024*1024)}MB"
     
-    if file_size == 0:
-        return False, "Empty file provided"
+    return True, None
+
+def validate_image_file(file: FileStorage, img: Image.Image) -> Tuple[bool, Optional[str]]:
+    """
+    Validate uploaded image file, including its dimensions and format
     
-    if file_size > Config.MAX_CONTENT_LENGTH:
-        return False, f"File too large. Maximum size: {Config.MAX_CONTENT_LENGTH // (1024*1024)}MB"
+    The image is opened once by the caller (Image.open only parses the
+    header); this just inspects its size and format. The API routes only
+    run validate_upload so they accept any image PIL can decode.
     
-    # Validate image format and dimensions
-    try:
-        with Image.open(file.stream) as img:
-            # Reset stream position
-            file.stream.seek(0)
-            
-            width, height = img.size
-            
-            # Check minimum dimensions
-            if width < Config.MIN_IMAGE_SIZE or height < Config.MIN_IMAGE_SIZE:
-                return False, f"Image too small. Minimum dimensions: {Config.MIN_IMAGE_SIZE}x{Config.MIN_IMAGE_SIZE}px"
-            
-            # Check maximum dimensions
-            if width > Config.MAX_IMAGE_WIDTH or height > Config.MAX_IMAGE_HEIGHT:
-                return False, f"Image too large. Maximum dimensions: {Config.MAX_IMAGE_WIDTH}x{Config.MAX_IMAGE_HEIGHT}px"
-            
-            # Check if image has valid format
-            if img.format not in ['PNG', 'JPEG', 'JPG', 'WEBP', 'BMP', 'TIFF']:
-                return False, f"Unsupported image format: {img.format}"
-                
-        return True, None
-        
-    except Exception as e:
-        return False, f"Invalid image file: {str(e)}"
+    Args:
+        file (FileStorage): Uploaded file object
+        img (PIL.Image.Image): Image opened from the upload
+    
+    Returns:
+        Tuple[bool, Optional[str]]: (is_valid, error_message)
+    """
+    is_valid, error_message = validate_upload(file)
+    if not is_valid:
+        return is_valid, error_message
+    
+    width, height = img.size
+    
+    # Check minimum dimensions
+    if width < Config.MIN_IMAGE_SIZE or height < Config.MIN_IMAGE_SIZE:
+        return False, f"Image too small. Minimum dimensions: {Config.MIN_IMAGE_SIZE}x{Config.MIN_IMAGE_SIZE}px"
+    
+    # Check maximum dimensions
+    if width > Config.MAX_IMAGE_WIDTH or height > Config.MAX_IMAGE_HEIGHT:
+        return False, f"Image too large. Maximum dimensions: {Config.MAX_IMAGE_WIDTH}x{Config.MAX_IMAGE_HEIGHT}px"
+    
+    # Check if image has valid format
+    if img.format not in ['PNG', 'JPEG', 'JPG', 'MPO', 'WEBP', 'BMP', 'TIFF']:
+        return False, f"Unsupported image format: {img.format}"
+    
+    return True, None
 
 def validate_background_color(color: str) -> Tuple[bool, Optional[str]]:
     """
@@ -88,11 +98,26 @@ def validate_background_color(color: str) -> Tuple[bool, Optional[str]]:
         return True, None  # Optional parameter
     
     # Check hex color format
-    if not color.startswith('#') or len(color) != 7:
+    if not match_hex_color(color):
         return False, "Background color must be in hex format (#RRGGBB)"
     
-    try:
-        int(color[1:], 16)  # Try to convert hex to int
-        return True, None
-    except ValueError:
-        return False, "Invalid hex color format"
+    return True, None
+
+@lru_cache(maxsize=256)
+def parse_hex_color(color: str) -> Tuple[int, int, int]:
+    """
+    Parse a #RRGGBB color into channel values
+    
+    Args:
+        color (str): Color in hex format
+        
+    Returns:
+        Tuple[int, int, int]: (red, green, blue) in 0-255
+        
+    Raises:
+        ValueError: If the color is not in #RRGGBB format
+    """
+    if not match_hex_color(color):
+        raise ValueError(f"Invalid hex color: {color}")
+    
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)